@@ -9,15 +9,14 @@ import subprocess
 import platform
 import time
 import sqlite3
-from pathlib import Path
 from difflib import SequenceMatcher
 
-import numpy as np
-import mss
-from PIL import Image  # noqa: F401  pillow只是给mss依赖，不需要直接使用
-import cv2
-import easyocr
-from pyzbar.pyzbar import decode # 用于二维码检测
+# numpy / mss / cv2 / easyocr / pyzbar 导入很慢（easyocr 还会拉起 torch）且需要图形环境，
+# 都放到用到它们的函数里再导入，只读状态的程序 import 本模块时不必付出这些开销。
+import notifier  # 状态切换的 Webhook 推送
+import payments  # 收款消息提取
+import statusmap  # 给本机读者的内存映射状态快照
+import status_client  # 数据库路径与 app.py 共用
 
 try:
     import pygetwindow as gw          # Windows/macOS能用
@@ -26,17 +25,21 @@ except (ImportError, NotImplementedError):
 
 # ============ 全局配置 ============
 WHITELIST = set("微信收款助手切换账号当前退出登录正在进入机")
-DB_PATH = Path(__file__).with_suffix(".db")
-# 初始化 EasyOCR Reader，指定中文和英文，不使用GPU，关闭详细输出
-READER = easyocr.Reader(["ch_sim", "en"], gpu=False, verbose=False)
+DB_PATH = status_client.DB_PATH  # 默认同目录下的 Merged.db，可用 WECHAT_DB_PATH 覆盖
+READER = None  # EasyOCR Reader，首次使用时由 get_reader() 创建
+STATUS_MAP = None  # 状态快照写者，init_db() 时创建，路径见 status_client.snapshot_path()
+# 收款消息是增量识别的，需要跨轮保存上一帧
+PAYMENT_EXTRACTOR = payments.PaymentExtractor(lambda img: get_reader().readtext(img, detail=1))
 IS_WIN = platform.system() == "Windows"
 IS_LINUX = platform.system() == "Linux"
 
 # ============ 数据库 ============
 def init_db():
     """
-    初始化SQLite数据库，创建status表（如果不存在）。
+    初始化SQLite数据库，创建status表（如果不存在），并打开状态快照文件。
     """
+    global STATUS_MAP
+    STATUS_MAP = statusmap.StatusMapWriter(status_client.snapshot_path(DB_PATH))
     with sqlite3.connect(DB_PATH) as conn:
         conn.execute(
             """
@@ -46,17 +49,38 @@ def init_db():
             )
             """
         )
+        notifier.init_outbox(conn)
+        payments.init_payments(conn)
 
 def update_status(code: str, content: str):
     """
     更新数据库中的状态码和内容。
-    每次只保留最新状态。
+    每次只保留最新状态；状态发生变化时同时写入发件箱，等待推送。
     """
+    queued = False
     with sqlite3.connect(DB_PATH) as conn:
+        prev = conn.execute("SELECT code, content FROM status LIMIT 1").fetchone()
+        if prev != (code, content):
+            queued = notifier.enqueue(conn, prev[0] if prev else None, code, content)
         conn.execute("DELETE FROM status") # 删除现有状态
         conn.execute("INSERT INTO status (code, content) VALUES (?, ?)", (code, content)) # 插入新状态
+    if queued:
+        notifier.wake()  # 事务已提交，发送线程现在能查到新事件
+    if STATUS_MAP is not None:
+        STATUS_MAP.publish(code, content)  # SQLite提交后再发布快照
 
 # ============ 工具函数 ============
+def get_reader():
+    """
+    获取EasyOCR Reader，第一次调用时才加载模型。
+    """
+    global READER
+    if READER is None:
+        import easyocr
+        # 初始化 EasyOCR Reader，指定中文和英文，不使用GPU，关闭详细输出
+        READER = easyocr.Reader(["ch_sim", "en"], gpu=False, verbose=False)
+    return READER
+
 def filter_text(txt: str) -> str:
     """
     过滤OCR识别的文本，只保留在白名单中的字符。
@@ -157,6 +181,9 @@ def ocr_from_wechat_corner(full: bool = False):
     返回:
         识别到的文本及其边界框和置信度列表。
     """
+    import numpy as np
+    import mss
+
     bbox = get_wechat_bbox(full)
     if not bbox:
         return []
@@ -164,7 +191,7 @@ def ocr_from_wechat_corner(full: bool = False):
         # 截取微信窗口的指定区域
         img = np.array(sct.grab(bbox))[:, :, :3]
     # 使用EasyOCR进行文本识别
-    res = READER.readtext(img, detail=1)
+    res = get_reader().readtext(img, detail=1)
     out = []
     for bbox_rel, text, conf in res:
         filtered = filter_text(text)
@@ -198,6 +225,35 @@ def get_center_from_bbox(bbox):
     xs, ys = zip(*bbox)
     return int(sum(xs) / 4), int(sum(ys) / 4)
 
+# ============ 收款消息提取 ============
+def extract_payments():
+    """
+    截取微信收款助手的聊天区，只识别新增的消息并保存收款记录。
+    返回:
+        新入库的收款记录数。
+    """
+    import numpy as np
+    import mss
+
+    bbox = get_wechat_bbox(full=True)
+    if not bbox:
+        return 0
+    area = {
+        "top": bbox["top"] + payments.CHAT_TOP,
+        "left": bbox["left"] + payments.CHAT_LEFT,
+        "width": bbox["width"] - payments.CHAT_LEFT,
+        "height": bbox["height"] - payments.CHAT_TOP - payments.CHAT_BOTTOM,
+    }
+    if area["width"] <= 0 or area["height"] <= 0:
+        return 0
+    with mss.mss() as sct:
+        img = np.array(sct.grab(area))[:, :, :3]
+    records = PAYMENT_EXTRACTOR.process(img)
+    if not records:
+        return 0
+    with sqlite3.connect(DB_PATH) as conn:
+        return payments.save_payments(conn, records)
+
 # ============ 颜色匹配 (来源于 color.py) ============
 def is_color_match_at_offset(
     origin, target_color, tolerance=10, offset_x=-2, offset_y=-2
@@ -216,6 +272,9 @@ def is_color_match_at_offset(
     返回:
         是否匹配 (True/False)
     """
+    import numpy as np
+    import mss
+
     x, y = origin
     new_x = x + offset_x
     new_y = y + offset_y
@@ -243,6 +302,11 @@ def detect_qrcode_from_screen():
    
     :return: str | False
     """
+    import numpy as np
+    import mss
+    import cv2
+    from pyzbar.pyzbar import decode # 用于二维码检测
+
     # 截取整个屏幕
     with mss.mss() as sct:
         monitor = sct.monitors[1]  # 假设monitor 1是主屏幕
@@ -275,50 +339,65 @@ def get_wechat_window_info():
 
 
 # ============ 主循环 ============
+def detect_once():
+    """
+    执行一轮界面识别并写入数据库。
+    返回:
+        本轮识别出的 (状态码, 内容)。
+    """
+    if get_wechat_window_info():  # 判断是否为微信窗口且符合基本尺寸
+        texts = ocr_from_wechat_corner(full=False)
+        match = find_best_match(texts, "微信收款助手")
+        if match:
+            first_point = match["bbox"][0]
+            # 使用从 color.py 整合过来的 is_color_match_at_offset
+            if is_color_match_at_offset(first_point, (210, 210, 210)):
+                code, content = "100", "None"  # 100：正常收款码
+                print("✅ 收款码界面正常")
+                if (n := extract_payments()):
+                    print(f"💰 新增收款记录 {n} 条")
+            else:
+                code, content = "101", str(get_center_from_bbox(match["bbox"]))
+                print("⚠️ 收款码界面异常，可能未加载完成")
+        else:
+            code, content = "102", "None"      # 102：收款码界面但未找到标题
+            print("⚠️ 收款码界面异常，未找到标题")
+    else:  # 不是收款码界面
+        # 使用从 detect_qrcode_from_screen.py 整合过来的 detect_qrcode_from_screen
+        qrcode = detect_qrcode_from_screen()
+        if qrcode:
+            code, content = "300", qrcode      # 300：登录二维码
+            print(f"✅ 检测到登录二维码：{qrcode}")
+        else:
+            texts = ocr_from_wechat_corner(full=True)
+            if find_best_match(texts, "当前账号") and find_best_match(texts, "退出登录"):
+                code, content = "200", "None"  # 200：主界面
+                print("✅ 检测到微信主界面")
+            elif (m := find_best_match(texts, "切换账号")):
+                code, content = "201", str(get_center_from_bbox(m["bbox"]))
+                print("✅ 检测到切换账号界面")
+            elif find_best_match(texts, "正在进入"):
+                code, content = "202", "None"
+                print("✅ 检测到正在进入界面")
+            elif find_best_match(texts, "手机") and find_best_match(texts, "登录"):
+                code, content = "203", "None"
+                print("✅ 检测到手机登录界面")
+            else:
+                code, content = "900", "None"  # 900：未知界面
+                print("❓ 检测到未知界面")
+    update_status(code, content)
+    return code, content
+
 def main():
     init_db()
+    get_reader()  # 启动时就加载OCR模型，不要拖到第一轮识别
+    if notifier.WEBHOOK_URLS:
+        notifier.Dispatcher(DB_PATH).start()
+        print(f"📨 状态变化将推送到: {', '.join(notifier.WEBHOOK_URLS)}")
     print(f"✅ 监控启动 (DB={DB_PATH})，按 Ctrl-C 退出")
     while True:
         time.sleep(1)
-
-        if get_wechat_window_info():  # 判断是否为微信窗口且符合基本尺寸
-            texts = ocr_from_wechat_corner(full=False)
-            match = find_best_match(texts, "微信收款助手")
-            if match:
-                first_point = match["bbox"][0]
-                # 使用从 color.py 整合过来的 is_color_match_at_offset
-                if is_color_match_at_offset(first_point, (210, 210, 210)):
-                    update_status("100", "None")  # 100：正常收款码
-                    print("✅ 收款码界面正常")
-                else:
-                    update_status("101", str(get_center_from_bbox(match["bbox"])))
-                    print("⚠️ 收款码界面异常，可能未加载完成")
-            else:
-                update_status("102", "None")      # 102：收款码界面但未找到标题
-                print("⚠️ 收款码界面异常，未找到标题")
-        else:  # 不是收款码界面
-            # 使用从 detect_qrcode_from_screen.py 整合过来的 detect_qrcode_from_screen
-            qrcode = detect_qrcode_from_screen()
-            if qrcode:
-                update_status("300", qrcode)      # 300：登录二维码
-                print(f"✅ 检测到登录二维码：{qrcode}")
-            else:
-                texts = ocr_from_wechat_corner(full=True)
-                if find_best_match(texts, "当前账号") and find_best_match(texts, "退出登录"):
-                    update_status("200", "None")  # 200：主界面
-                    print("✅ 检测到微信主界面")
-                elif (m := find_best_match(texts, "切换账号")):
-                    update_status("201", str(get_center_from_bbox(m["bbox"])))
-                    print("✅ 检测到切换账号界面")
-                elif find_best_match(texts, "正在进入"):
-                    update_status("202", "None")
-                    print("✅ 检测到正在进入界面")
-                elif find_best_match(texts, "手机") and find_best_match(texts, "登录"):
-                    update_status("203", "None")
-                    print("✅ 检测到手机登录界面")
-                else:
-                    update_status("900", "None")  # 900：未知界面
-                    print("❓ 检测到未知界面")
+        detect_once()
 
 if __name__ == "__main__":
     try:
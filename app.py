@@ -1,43 +1,24 @@
 from flask import Flask, render_template_string, request, jsonify
-import sqlite3
-import qrcode
 import io
 import base64
-import pyautogui
 import ast
 
-app = Flask(__name__)
-
-# 状态码定义
-wechat_states = {
-    100: {"key": "dialog_selected", "desc": "✅ 微信收款助手对话框已选中"},
-    101: {"key": "dialog_not_selected", "desc": "⚠️ 微信收款助手未选中"},
-    102: {"key": "no_wechat_assistant", "desc": "⚠️ 未检测到微信收款助手"},
+from status_client import wechat_states  # noqa: F401  兼容原来从 app 导入状态表的代码
+from status_client import describe, get_latest_status as read_status
+import status_client
 
-    200: {"key": "account_logged_out", "desc": "❌ 当前账号已掉线"},
-    201: {"key": "switching_account", "desc": "🔄 正在切换账号"},
-    202: {"key": "logging_in", "desc": "🔄 正在进入微信"},
-    203: {"key": "mobile_login_required", "desc": "📱 请在手机完成登录"},
+# qrcode 和 pyautogui 只在生成二维码/点击时才导入：
+# pyautogui 导入时就要连接显示器，放在模块顶层会让无头环境下的状态页直接启动失败
 
-    300: {"key": "qrcode_detected", "desc": "🔄 二维码识别成功，等待扫码"},
-
-    900: {"key": "no_window_or_qrcode", "desc": "❗ 未检测到微信窗口或二维码"},
-    901: {"key": "unknown", "desc": "❓ 未知状态"}
-}
+app = Flask(__name__)
 
-DB_PATH = 'status.db'
+DB_PATH = status_client.DB_PATH  # 与 Merged.py 共用，可用 WECHAT_DB_PATH 覆盖
 
 def get_latest_status():
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute('SELECT code, content FROM status LIMIT 1')
-    row = cursor.fetchone()
-    conn.close()
-    if row:
-        return int(row[0]), row[1]
-    return None, None
+    return read_status(DB_PATH)
 
 def generate_qrcode_base64(data):
+    import qrcode
     qr = qrcode.QRCode(box_size=6, border=1)
     qr.add_data(data)
     qr.make(fit=True)
@@ -48,6 +29,7 @@ def generate_qrcode_base64(data):
 
 def click_coord(x, y):
     try:
+        import pyautogui
         pyautogui.moveTo(x, y, duration=0.2)
         pyautogui.click()
         print(f"🖱️ 已点击坐标: ({x}, {y})")
@@ -60,7 +42,7 @@ def index():
     if code is None:
         return "❌ 暂无状态数据"
 
-    state_info = wechat_states.get(code, wechat_states[901])
+    state_info = describe(code)
 
     show_button = False
     show_qrcode = False
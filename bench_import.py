@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+bench_import.py
+导入耗时回归检查：用 `python -X importtime` 分别测量状态页(app.py)和
+监控脚本(Merged.py)的 import 耗时，超出预算或提前导入了重依赖就返回非零退出码。
+
+子进程里去掉了 DISPLAY，模拟无头服务器；每个模块测多次取最小值，减少抖动。
+
+用法:
+    python bench_import.py [--dashboard-budget 400] [--monitor-budget 150] [--repeat 5]
+"""
+import os
+import sys
+import argparse
+import subprocess
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+
+# 模块 -> 不允许在 import 阶段出现的重依赖
+TARGETS = {
+    "app": ("dashboard", {"pyautogui", "qrcode", "cv2", "easyocr", "torch", "numpy", "mss", "pyzbar", "Merged"}),
+    "Merged": ("monitor", {"pyautogui", "cv2", "easyocr", "torch", "numpy", "mss", "pyzbar", "PIL"}),
+}
+
+def measure(module: str):
+    """
+    在干净的子进程里导入module一次。
+    返回:
+        (module本身的累计耗时毫秒, 本次导入过程中出现的全部模块名集合)
+    """
+    env = {k: v for k, v in os.environ.items() if k not in ("DISPLAY", "WAYLAND_DISPLAY")}
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=HERE, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} 失败:\n{proc.stderr.strip().splitlines()[-1]}")
+    total, seen = None, set()
+    for line in proc.stderr.splitlines():
+        # 格式: "import time:  self [us] | cumulative | imported package"
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        name = parts[2].strip()
+        seen.add(name)
+        if name == module:
+            total = int(parts[1]) / 1000
+    return total, seen
+
+def main():
+    parser = argparse.ArgumentParser(description="import 耗时预算检查")
+    parser.add_argument("--dashboard-budget", type=float, default=400.0, help="app.py 导入预算（毫秒）")
+    parser.add_argument("--monitor-budget", type=float, default=150.0, help="Merged.py 导入预算（毫秒）")
+    parser.add_argument("--repeat", type=int, default=5, help="每个模块测量次数，取最小值")
+    args = parser.parse_args()
+    budgets = {"dashboard": args.dashboard_budget, "monitor": args.monitor_budget}
+
+    failed = False
+    for module, (role, forbidden) in TARGETS.items():
+        try:
+            runs = [measure(module) for _ in range(args.repeat)]
+        except RuntimeError as e:
+            print(f"❌ {role}: {e}")
+            failed = True
+            continue
+        best = min(t for t, _ in runs)
+        heavy = sorted({m.split(".")[0] for _, seen in runs for m in seen} & forbidden)
+        ok = best <= budgets[role] and not heavy
+        failed |= not ok
+        print(f"{'✅' if ok else '❌'} {role:<9} import {module:<7} {best:7.1f}ms / 预算 {budgets[role]:.0f}ms")
+        if heavy:
+            print(f"   提前导入了重依赖: {', '.join(heavy)}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
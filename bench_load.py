@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+bench_load.py
+无头端到端压测：在 Xvfb 虚拟显示器上画假的"微信"窗口，
+用 Merged.py 的识别逻辑盯着它们，同时并发请求 app.py 的状态页。
+
+每个窗口占一个独立的 Xvfb 显示器（带一个窗口管理器，wmctrl 需要它），
+由一个识别进程负责，和真实部署里"一个账号一个监控进程"一致。
+按 --steps 逐级增加窗口数，报告：
+  - 每核最多可持续监控的窗口数（识别一轮的 p99 耗时不超过监控间隔）
+  - 画面切换后到识别出新状态的 p99 延迟
+  - 压测期间 app.py 状态页的 p50/p99 延迟
+
+依赖: Xvfb、openbox（或 --wm 指定的其他窗口管理器）、wmctrl、
+      tkinter、中文字体（如 fonts-noto-cjk），以及 Merged.py/app.py 本身的依赖。
+
+用法:
+    python bench_load.py --steps 1,2,4,8 --clients 16
+"""
+import os
+import sys
+import json
+import math
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import threading
+import subprocess
+import urllib.request
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+
+# 画面名 -> 期望 Merged.py 识别出的状态码
+SCREENS = {
+    "payment": "100",   # 收款助手对话框，标题左上角是(210,210,210)的选中底色
+    "login_qr": "300",  # 登录二维码
+    "switch": "201",    # 切换账号
+    "unknown": "900",   # 无法识别的界面
+}
+QR_DATA = "https://login.weixin.qq.com/l/bench"
+MAIN_SIZE = (800, 600)   # >= 500x500，走收款码分支
+LOGIN_SIZE = (280, 400)  # 登录类小窗口
+
+# ============ 工具函数 ============
+def percentile(values, p):
+    """
+    返回values的第p百分位数（最近秩法），空列表返回None。
+    """
+    if not values:
+        return None
+    values = sorted(values)
+    k = max(0, math.ceil(p / 100 * len(values)) - 1)
+    return values[k]
+
+def fmt_ms(seconds):
+    return "-" if seconds is None else f"{seconds * 1000:.1f}ms"
+
+# ============ 假微信窗口 (子进程) ============
+def run_fake_window():
+    """
+    画一个标题为"微信"的tk窗口，从stdin按行读取要显示的画面名。
+    """
+    import tkinter as tk
+    import qrcode
+    from PIL import ImageTk
+
+    root = tk.Tk()
+    root.title("微信")
+    root.geometry("+0+0")
+    canvas = tk.Canvas(root, highlightthickness=0, bg="white")
+    canvas.pack(fill="both", expand=True)
+    qr_img = ImageTk.PhotoImage(qrcode.make(QR_DATA, box_size=5, border=2).convert("RGB"))
+    font = ("Noto Sans CJK SC", 16)
+
+    def show(name):
+        canvas.delete("all")
+        w, h = MAIN_SIZE if name == "payment" else LOGIN_SIZE
+        root.geometry(f"{w}x{h}+0+0")
+        if name == "payment":
+            canvas.create_rectangle(0, 0, 260, 80, fill="#d2d2d2", width=0)
+            canvas.create_text(20, 30, text="微信收款助手", anchor="nw", font=font)
+            canvas.create_text(20, 120, text="收款到账通知", anchor="nw", font=font)
+        elif name == "login_qr":
+            canvas.create_image(w // 2, h // 2, image=qr_img)
+        elif name == "switch":
+            canvas.create_text(w // 2, h - 80, text="切换账号", font=font)
+        else:
+            canvas.create_text(w // 2, h // 2, text="Hello", font=font)
+        root.update_idletasks()
+
+    def read_commands():
+        for line in sys.stdin:
+            name = line.strip()
+            if name in SCREENS:
+                root.after(0, show, name)
+        root.after(0, root.destroy)
+
+    show("unknown")
+    threading.Thread(target=read_commands, daemon=True).start()
+    root.mainloop()
+
+# ============ 识别进程 (子进程) ============
+def run_detector(db_path, interval):
+    """
+    按监控间隔循环调用Merged.detect_once，每轮向stdout输出一行JSON:
+    {"start": 开始时间, "end": 结束时间, "code": 状态码}
+    """
+    import contextlib
+    sys.path.insert(0, str(HERE))
+    import Merged
+
+    Merged.DB_PATH = Path(db_path)
+    Merged.init_db()
+    while True:
+        start = time.time()
+        with contextlib.redirect_stdout(sys.stderr):
+            code, _ = Merged.detect_once()
+        end = time.time()
+        print(json.dumps({"start": start, "end": end, "code": code}), flush=True)
+        time.sleep(max(0.0, interval - (end - start)))
+
+# ============ 压测主流程 ============
+class Display:
+    """
+    一个Xvfb显示器 + 窗口管理器 + 假微信窗口 + 识别进程。
+    """
+
+    def __init__(self, number, workdir, args):
+        self.name = f":{number}"
+        self.db_path = workdir / f"status_{number}.db"
+        self.ticks = []
+        self.procs = []
+        self.screen = "unknown"  # 假窗口启动时显示的画面
+        env = dict(os.environ, DISPLAY=self.name)
+        self.procs.append(subprocess.Popen(
+            ["Xvfb", self.name, "-screen", "0", "1280x800x24", "-nolisten", "tcp"],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        ))
+        time.sleep(0.5)
+        self.procs.append(subprocess.Popen([args.wm], env=env,
+                                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL))
+        self.window = subprocess.Popen([sys.executable, __file__, "--fake-window"], env=env,
+                                       stdin=subprocess.PIPE, text=True)
+        self.procs.append(self.window)
+        self.detector = subprocess.Popen(
+            [sys.executable, __file__, "--detect", str(self.db_path), "--interval", str(args.interval)],
+            env=env, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+        )
+        self.procs.append(self.detector)
+        threading.Thread(target=self._collect, daemon=True).start()
+
+    def _collect(self):
+        for line in self.detector.stdout:
+            try:
+                self.ticks.append(json.loads(line))
+            except ValueError:
+                pass
+
+    def show(self, screen):
+        self.window.stdin.write(screen + "\n")
+        self.window.stdin.flush()
+        self.screen = screen
+
+    def latency_since(self, t0, code):
+        """
+        画面在t0切换后，第一次识别出code的延迟；还没识别出来返回None。
+        只统计t0之后才开始的识别轮次，跨过t0的那一轮截到的可能还是旧画面。
+        """
+        for tick in list(self.ticks):
+            if tick["start"] >= t0 and tick["code"] == code:
+                return tick["end"] - t0
+        return None
+
+    def close(self):
+        for p in reversed(self.procs):
+            p.terminate()
+        for p in self.procs:
+            try:
+                p.wait(5)
+            except subprocess.TimeoutExpired:
+                p.kill()
+
+def hammer_dashboard(url, clients, stop):
+    """
+    启动clients个线程不停请求状态页，返回 (线程列表, 延迟列表, 失败次数)，stop置位后线程退出。
+    """
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+
+    def worker():
+        while not stop.is_set():
+            t = time.perf_counter()
+            try:
+                with urllib.request.urlopen(url, timeout=10) as resp:
+                    resp.read()
+                ok = resp.status == 200
+            except OSError:
+                ok = False
+            dt = time.perf_counter() - t
+            with lock:
+                if ok:
+                    latencies.append(dt)
+                else:
+                    errors[0] += 1
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(clients)]
+    for t in threads:
+        t.start()
+    return threads, latencies, errors
+
+def run_step(n, workdir, args):
+    """
+    用n个窗口跑一轮压测，返回统计结果。
+    """
+    displays = [Display(args.display_base + i, workdir, args) for i in range(n)]
+    app = None
+    try:
+        # 等所有识别进程加载完OCR模型、跑完第一轮
+        deadline = time.time() + args.warmup_timeout
+        while any(not d.ticks for d in displays):
+            if time.time() > deadline:
+                raise RuntimeError("识别进程启动超时")
+            time.sleep(0.5)
+
+        if args.app_url is None:
+            # 状态页读第一个窗口的数据库和快照
+            app = subprocess.Popen([sys.executable, str(HERE / "app.py")], cwd=workdir,
+                                   env=dict(os.environ, DISPLAY=displays[0].name,
+                                            WECHAT_DB_PATH=str(displays[0].db_path)),
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            time.sleep(2)
+        url = args.app_url or "http://127.0.0.1:5000/"
+        stop = threading.Event()
+        threads, dash, dash_errors = hammer_dashboard(url, args.clients, stop)
+
+        tick_start = max(d.ticks[-1]["end"] for d in displays)
+        detect, missed = [], 0
+        for _ in range(args.rounds):
+            changes = []
+            for d in displays:
+                # 每轮都换成和当前不同的画面，否则测到的是"没变化"的延迟
+                screen = random.choice([s for s in SCREENS if s != d.screen])
+                t0 = time.time()
+                d.show(screen)
+                changes.append((d, t0, SCREENS[screen]))
+            time.sleep(args.switch_every)
+            for d, t0, code in changes:
+                dt = d.latency_since(t0, code)
+                if dt is None:
+                    missed += 1
+                else:
+                    detect.append(dt)
+
+        stop.set()
+        for t in threads:
+            t.join()
+        durations = [t["end"] - t["start"] for d in displays for t in d.ticks if t["start"] >= tick_start]
+    finally:
+        if app is not None:
+            app.terminate()
+            app.wait()
+        for d in displays:
+            d.close()
+
+    tick_p99 = percentile(durations, 99)
+    return {
+        "windows": n,
+        "tick_p99": tick_p99,
+        "detect_p99": percentile(detect, 99),
+        "missed": missed,
+        "dash_p50": percentile(dash, 50),
+        "dash_p99": percentile(dash, 99),
+        "dash_rps": len(dash) / (args.rounds * args.switch_every),
+        "dash_errors": dash_errors[0],
+        "sustainable": tick_p99 is not None and tick_p99 <= args.interval and missed == 0,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Xvfb 无头端到端压测")
+    parser.add_argument("--steps", default="1,2,4,8", help="逐级测试的窗口数，逗号分隔")
+    parser.add_argument("--clients", type=int, default=16, help="并发请求状态页的客户端数")
+    parser.add_argument("--rounds", type=int, default=10, help="每级切换画面的轮数")
+    parser.add_argument("--switch-every", type=float, default=5.0, help="每轮画面保持的秒数")
+    parser.add_argument("--interval", type=float, default=1.0, help="监控间隔，与Merged.py一致")
+    parser.add_argument("--display-base", type=int, default=90, help="第一个Xvfb显示器编号")
+    parser.add_argument("--wm", default="openbox", help="窗口管理器命令")
+    parser.add_argument("--app-url", default=None, help="已运行的状态页地址；不填则自动启动app.py")
+    parser.add_argument("--warmup-timeout", type=float, default=120.0)
+    parser.add_argument("--fake-window", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--detect", metavar="DB", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.fake_window:
+        return run_fake_window()
+    if args.detect:
+        return run_detector(args.detect, args.interval)
+
+    for tool in ("Xvfb", args.wm, "wmctrl"):
+        if shutil.which(tool) is None:
+            print(f"❌ 找不到 {tool}，请先安装", file=sys.stderr)
+            return 1
+
+    cores = os.cpu_count() or 1
+    results = []
+    with tempfile.TemporaryDirectory(prefix="wechat-bench-") as tmp:
+        for n in (int(x) for x in args.steps.split(",")):
+            r = run_step(n, Path(tmp), args)
+            results.append(r)
+            print(
+                f"{'✅' if r['sustainable'] else '❌'} 窗口数={n:<3d} "
+                f"识别一轮p99={fmt_ms(r['tick_p99'])} 切换后识别p99={fmt_ms(r['detect_p99'])} "
+                f"漏识别={r['missed']} 状态页p50={fmt_ms(r['dash_p50'])} p99={fmt_ms(r['dash_p99'])} "
+                f"({r['dash_rps']:.0f} req/s, 失败{r['dash_errors']})"
+            )
+            if not r["sustainable"]:
+                break
+
+    best = max((r["windows"] for r in results if r["sustainable"]), default=0)
+    print(f"\n📊 CPU 核数: {cores}")
+    print(f"📊 最大可持续窗口数: {best}（每核 {best / cores:.2f} 个）")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+bench_statusmap.py
+状态快照并发检查：一个写进程尽可能快地发布快照，多个读进程同时不停读取，
+校验每次读到的状态码、内容、时间戳是否来自同一次发布（没有撕裂读），
+并报告写入速率和单次读取延迟。发现撕裂读时返回非零退出码。
+
+用法:
+    python bench_statusmap.py [--readers 8] [--duration 5]
+"""
+import sys
+import time
+import argparse
+import tempfile
+import multiprocessing as mp
+from pathlib import Path
+
+import statusmap
+from bench_load import percentile
+
+def make_state(i: int):
+    """
+    第i次发布的内容：状态码、时间戳和内容都由i决定，长度也随i变化，便于发现撕裂。
+    """
+    return i % 1000, float(i), f"{i}," * (i % 97)
+
+def writer(path, stop, published):
+    w = statusmap.StatusMapWriter(path)
+    i = 0
+    while not stop.is_set():
+        i += 1
+        code, ts, content = make_state(i)
+        w.publish(code, content, ts)
+    published.value = i
+    w.close()
+
+def reader(path, stop, results):
+    r = statusmap.StatusMapReader(path)
+    reads = torn = misses = 0
+    last_seq = 0
+    samples = []
+    while not stop.is_set():
+        t = time.perf_counter()
+        snap = r.read()
+        dt = time.perf_counter() - t
+        reads += 1
+        if snap is None:
+            misses += last_seq > 0  # 写者第一次发布之前读不到是正常的
+            continue
+        seq, code, content, ts = snap
+        expected = make_state(int(ts)) if ts > 0 and ts.is_integer() else None
+        if (code, ts, content) != expected or seq < last_seq:
+            torn += 1
+        last_seq = seq
+        if reads % 16 == 0:
+            samples.append(dt)
+    r.close()
+    results.put((reads, torn, misses, samples))
+
+def run(readers: int, duration: float):
+    """
+    在临时文件上运行一个写进程和readers个读进程，持续duration秒。
+    返回:
+        (写入次数, 读取次数, 撕裂读次数, 重试耗尽次数, 读延迟样本)
+    """
+    with tempfile.TemporaryDirectory(prefix="statusmap-") as tmp:
+        path = Path(tmp) / "status.map"
+        statusmap.StatusMapWriter(path).close()  # 先建好文件，读者才能打开
+        stop = mp.Event()
+        published = mp.Value("q", 0)
+        results = mp.Queue()
+        procs = [mp.Process(target=writer, args=(path, stop, published))]
+        procs += [mp.Process(target=reader, args=(path, stop, results)) for _ in range(readers)]
+        for p in procs:
+            p.start()
+        time.sleep(duration)
+        stop.set()
+        stats = [results.get() for _ in range(readers)]
+        for p in procs:
+            p.join()
+
+    reads = sum(s[0] for s in stats)
+    torn = sum(s[1] for s in stats)
+    misses = sum(s[2] for s in stats)
+    samples = [x for s in stats for x in s[3]]
+    return published.value, reads, torn, misses, samples
+
+def main():
+    parser = argparse.ArgumentParser(description="状态快照撕裂读检查")
+    parser.add_argument("--readers", type=int, default=8, help="读进程数")
+    parser.add_argument("--duration", type=float, default=5.0, help="运行秒数")
+    args = parser.parse_args()
+
+    published, reads, torn, misses, samples = run(args.readers, args.duration)
+    print(f"写入: {published / args.duration:,.0f} 次/秒")
+    print(f"读取: {reads / args.duration:,.0f} 次/秒（{args.readers} 个读进程），重试耗尽 {misses} 次")
+    print(f"读延迟: p50 {(percentile(samples, 50) or 0.0) * 1e6:.1f}µs  p99 {(percentile(samples, 99) or 0.0) * 1e6:.1f}µs")
+    print(f"{'✅' if torn == 0 else '❌'} 撕裂读: {torn}")
+    return 1 if torn else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+notifier.py
+状态变化推送：把 Merged.py 的状态切换写入发件箱(outbox)表，
+由后台线程批量 POST 到配置的 Webhook 地址，失败按指数退避重试。
+发件箱与状态表在同一个 SQLite 库里，进程重启后未送达的事件会继续发送。
+重试次数用完、对方返回 400/413/422、或地址已从配置中移除的事件标记为 dead，
+留在表里供排查，不再发送，也不会堵住后面的事件。
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import sqlite3
+import threading
+import http.client
+from urllib.parse import urlsplit
+
+# ============ 全局配置 ============
+# 多个地址用逗号分隔，例如: WECHAT_WEBHOOK_URLS=http://127.0.0.1:8000/hook,https://example.com/wx
+WEBHOOK_URLS = [u.strip() for u in os.environ.get("WECHAT_WEBHOOK_URLS", "").split(",") if u.strip()]
+BATCH_SIZE = 50        # 每个目标每次最多合并发送的事件数
+BATCH_WAIT = 0.5       # 被唤醒后等待多少秒，让短时间内的多次切换合并成一批
+POLL_INTERVAL = 5.0    # 没有新事件时，多久检查一次到期的重试
+RETRY_BASE = 1.0       # 第一次重试的间隔（秒），之后每次翻倍
+RETRY_MAX = 300.0      # 重试间隔上限（秒）
+MAX_ATTEMPTS = 12      # 累计失败这么多次后放弃（按上面的退避约半小时）
+PERMANENT_STATUS = {400, 413, 422}  # 请求本身不会被接受，重试也没用
+HTTP_TIMEOUT = 5.0
+
+# 新事件提交后由 wake() 唤醒发送线程
+_wakeup = threading.Event()
+
+# ============ 发件箱 ============
+def init_outbox(conn: sqlite3.Connection):
+    """
+    创建outbox表（如果不存在）。
+    """
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            target TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_try REAL NOT NULL,
+            created REAL NOT NULL,
+            dead INTEGER NOT NULL DEFAULT 0,
+            last_error TEXT
+        )
+        """
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS outbox_pending ON outbox (target, dead, id)")
+
+def enqueue(conn: sqlite3.Connection, prev_code, code: str, content: str, targets=None):
+    """
+    记录一次状态切换，每个Webhook目标各写一行。
+    每个事件带一个入队时生成的id：推送是至少一次的（超时、断线都会重发），
+    接收方可以按id去重。
+    传入调用方已打开的连接，这样事件与状态更新处于同一个事务中，不会丢失。
+    事务提交后调用方应再调用 wake()，发送线程才不会错过这批事件。
+    参数:
+        prev_code: 切换前的状态码，首次启动时为None
+        targets: Webhook地址列表，默认使用WEBHOOK_URLS
+    返回:
+        是否写入了事件。
+    """
+    targets = WEBHOOK_URLS if targets is None else targets
+    if not targets:
+        return False
+    now = time.time()
+    payload = json.dumps(
+        {"id": uuid.uuid4().hex, "prev_code": prev_code, "code": code, "content": content, "ts": now},
+        ensure_ascii=False,
+    )
+    conn.executemany(
+        "INSERT INTO outbox (target, payload, next_try, created) VALUES (?, ?, ?, ?)",
+        [(t, payload, now, now) for t in targets],
+    )
+    return True
+
+def wake():
+    """
+    通知发送线程有新事件。必须在写入事件的事务提交之后调用。
+    """
+    _wakeup.set()
+
+def retry_delay(attempts: int) -> float:
+    """
+    第attempts次失败后的等待时间：RETRY_BASE * 2^(attempts-1)，不超过RETRY_MAX。
+    """
+    return min(RETRY_MAX, RETRY_BASE * (2 ** max(0, attempts - 1)))
+
+# ============ HTTP 连接池 ============
+class ConnectionPool:
+    """
+    按 (scheme, host, port) 复用 HTTP 长连接。
+    只在发送线程内使用，不需要加锁。
+    """
+
+    def __init__(self, timeout: float = HTTP_TIMEOUT):
+        self.timeout = timeout
+        self._conns = {}
+
+    def _connect(self, scheme, netloc):
+        cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+        return cls(netloc, timeout=self.timeout)
+
+    def post_json(self, url: str, body: bytes) -> int:
+        """
+        POST JSON数据并返回HTTP状态码。网络错误直接抛出。
+        复用的连接已被对端关闭时，重新建连再发一次。
+        """
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.netloc)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        headers = {"Content-Type": "application/json; charset=utf-8"}
+
+        for reused in (key in self._conns, False):
+            conn = self._conns.get(key) if reused else None
+            if conn is None:
+                conn = self._connect(*key)
+                self._conns[key] = conn
+            try:
+                conn.request("POST", path, body=body, headers=headers)
+                resp = conn.getresponse()
+                resp.read()  # 读完响应体，连接才能复用
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                self.discard(key)
+                if reused:
+                    continue
+                raise
+            except Exception:
+                self.discard(key)
+                raise
+            if resp.will_close:
+                self.discard(key)
+            return resp.status
+
+    def discard(self, key):
+        conn = self._conns.pop(key, None)
+        if conn is not None:
+            conn.close()
+
+    def close(self):
+        for key in list(self._conns):
+            self.discard(key)
+
+# ============ 发送线程 ============
+class Dispatcher(threading.Thread):
+    """
+    后台线程：取出到期的发件箱事件，按目标合并成一批POST出去。
+    请求体格式: {"events": [{"id", "prev_code", "code", "content", "ts"}, ...]}
+    2xx视为成功并删除；PERMANENT_STATUS里的状态码说明这一批本身有问题，直接标记为dead；
+    其他失败（网络错误、5xx、部署期间短暂的401/403/404等）推迟重试，超过MAX_ATTEMPTS次才标记为dead。
+    任何失败后都停止发送该目标，一次flush最多丢弃一批。
+    """
+
+    def __init__(self, db_path, targets=None, batch_size: int = BATCH_SIZE, batch_wait: float = BATCH_WAIT,
+                 poll_interval: float = POLL_INTERVAL, timeout: float = HTTP_TIMEOUT):
+        super().__init__(name="webhook-dispatcher", daemon=True)
+        self.db_path = db_path
+        self.targets = list(WEBHOOK_URLS if targets is None else targets)
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.poll_interval = poll_interval
+        self.pool = ConnectionPool(timeout)
+        self._stopping = threading.Event()
+
+    def stop(self):
+        self._stopping.set()
+        _wakeup.set()
+
+    def run(self):
+        with sqlite3.connect(self.db_path) as conn:
+            init_outbox(conn)
+        try:
+            while not self._stopping.is_set():
+                if _wakeup.wait(self.poll_interval):
+                    # 有新事件：稍等一会，把连续的切换攒成一批
+                    self._stopping.wait(self.batch_wait)
+                _wakeup.clear()
+                self.flush()
+        finally:
+            self.pool.close()
+
+    def flush(self) -> int:
+        """
+        发送当前所有到期事件，返回成功送达的事件数。
+        """
+        sent = 0
+        conn = sqlite3.connect(self.db_path)
+        try:
+            now = time.time()
+            # 已从配置中移除的地址不再发送
+            placeholders = ", ".join("?" * len(self.targets))
+            with conn:
+                conn.execute(
+                    f"UPDATE outbox SET dead = 1, last_error = 'target removed from config' "
+                    f"WHERE dead = 0 AND target NOT IN ({placeholders})",
+                    self.targets,
+                )
+            for target in self.targets:
+                while True:
+                    # 按写入顺序取，队首事件还在退避期时整个目标都等待，保证推送顺序
+                    rows = conn.execute(
+                        "SELECT id, payload, attempts, next_try FROM outbox "
+                        "WHERE target = ? AND dead = 0 ORDER BY id LIMIT ?",
+                        (target, self.batch_size),
+                    ).fetchall()
+                    if not rows or rows[0][3] > now:
+                        break
+                    ok, retryable, error = self._send(target, rows)
+                    if ok:
+                        with conn:
+                            conn.executemany("DELETE FROM outbox WHERE id = ?", [(r[0],) for r in rows])
+                        sent += len(rows)
+                        continue
+                    with conn:
+                        conn.executemany(
+                            "UPDATE outbox SET attempts = ?, next_try = ?, dead = ?, last_error = ? WHERE id = ?",
+                            [
+                                (a + 1, now + retry_delay(a + 1), int(not retryable or a + 1 >= MAX_ATTEMPTS), error, i)
+                                for i, _, a, _ in rows
+                            ],
+                        )
+                    break  # 该目标出了问题，剩下的事件等下一轮
+        finally:
+            conn.close()
+        return sent
+
+    def _send(self, target: str, rows):
+        """
+        返回:
+            (是否成功, 失败时是否值得重试, 错误说明)
+        """
+        body = '{"events": [' + ", ".join(r[1] for r in rows) + "]}"
+        try:
+            status = self.pool.post_json(target, body.encode("utf-8"))
+        except (OSError, http.client.HTTPException) as e:
+            print(f"⚠️ Webhook 发送失败 {target}: {e}", file=sys.stderr)
+            return False, True, str(e)
+        if 200 <= status < 300:
+            return True, False, None
+        print(f"⚠️ Webhook 返回 {status}: {target}", file=sys.stderr)
+        return False, status not in PERMANENT_STATUS, f"HTTP {status}"
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+payments.py
+从"微信收款助手"聊天中提取收款记录。
+每轮只 OCR 聊天区新出现的部分：与上一帧逐行比较，算出内容向上滚动了多少像素
+（聊天未满时则找第一处变化的行），只有这之后的部分才是新消息。
+解析出金额、时间、付款方后写入 SQLite，主键是由收款日期和消息卡片内容算出的哈希，
+重复识别同一条消息不会重复入库。卡片里的"汇总 今日第N笔收款"能区分同一天金额相同的两笔；
+没有这一行的卡片无法区分时，冲突会记到 payment_collisions 表里，而不是悄悄丢掉。
+"""
+import re
+import time
+import hashlib
+import sqlite3
+import datetime
+
+# ============ 全局配置 ============
+# 聊天消息区相对微信窗口的位置（像素）：左侧导航+会话列表、顶部标题栏、底部输入框
+CHAT_LEFT = 310
+CHAT_TOP = 60
+CHAT_BOTTOM = 150
+NEW_MARGIN = 40       # 新区域向上多截一点，避免把跨边界的消息切成两半
+MATCH_RATIO = 0.98    # 两帧重叠部分至少这么多行一致才认为是滚动
+LINE_GAP = 10         # 纵向中心相差不超过此值的文本框归为同一行
+
+# 卡片标题："收款到账通知"，或旧样式的"微信支付收款12.00元"
+CARD_RE = re.compile(r"收款到账通知|微信支付收款\s*[￥¥]?\s*(\d+(?:\.\d{1,2})?)")
+AMOUNT_RE = re.compile(r"收款金额\s*[:：]?\s*[￥¥]?\s*(\d+(?:\.\d{1,2})?)")
+SUMMARY_RE = re.compile(r"汇总.*?第\s*(\d+)\s*笔.*?共计\s*[￥¥]?\s*(\d+(?:\.\d{1,2})?)")
+TIME_RE = re.compile(
+    r"(?:(\d{4})年)?(?:(\d{1,2})月(\d{1,2})日)?\s*(昨天|星期[一二三四五六日天])?\s*(?:上午|下午)?\s*\d{1,2}:\d{2}"
+)
+WEEKDAYS = "一二三四五六日"
+PAYER_RE = re.compile(r"(?:付款方(?!备注)|付款人|来自)\s*[:：]?\s*(\S.*)")
+
+# ============ 数据库 ============
+def init_payments(conn: sqlite3.Connection):
+    """
+    创建payments表（如果不存在）。
+    """
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS payments (
+            hash TEXT PRIMARY KEY,
+            day TEXT,
+            amount TEXT NOT NULL,
+            paid_at TEXT,
+            payer TEXT,
+            raw TEXT,
+            created REAL NOT NULL
+        )
+        """
+    )
+    # 没有汇总行的卡片哈希相同时，可能是重复识别，也可能是真的又收了一笔同样的钱，留给人工核对
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS payment_collisions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            hash TEXT NOT NULL,
+            paid_at TEXT,
+            raw TEXT,
+            created REAL NOT NULL
+        )
+        """
+    )
+
+def save_payments(conn: sqlite3.Connection, records) -> int:
+    """
+    写入收款记录，已存在的哈希不重复插入。
+    以下哈希冲突都是重复识别，直接忽略：带汇总行的卡片、落在与上一帧重叠区域里的卡片、
+    原文与已存记录完全相同的卡片（例如重启后整屏重读）。
+    其余冲突无法判断是否真的又收了一笔，写入payment_collisions。
+    返回:
+        新插入的条数。
+    """
+    now = time.time()
+    inserted = 0
+    for r in records:
+        cur = conn.execute(
+            "INSERT OR IGNORE INTO payments (hash, day, amount, paid_at, payer, raw, created) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (r["hash"], r["day"], r["amount"], r["paid_at"], r["payer"], r["raw"], now),
+        )
+        if cur.rowcount:
+            inserted += 1
+            continue
+        if r["summary"] is not None or r.get("reread"):
+            continue
+        stored = conn.execute("SELECT raw FROM payments WHERE hash = ?", (r["hash"],)).fetchone()
+        if stored is None or stored[0] != r["raw"]:
+            conn.execute(
+                "INSERT INTO payment_collisions (hash, paid_at, raw, created) VALUES (?, ?, ?, ?)",
+                (r["hash"], r["paid_at"], r["raw"], now),
+            )
+    return inserted
+
+# ============ 帧差分 ============
+def _row_signatures(img):
+    """
+    每一行像素压成一个整数，用于快速比较两帧。
+    """
+    import numpy as np
+
+    gray = img if img.ndim == 2 else img[:, :, :3].astype(np.uint32).sum(axis=2)
+    weights = np.arange(1, gray.shape[1] + 1, dtype=np.uint64)
+    return gray.astype(np.uint64) @ weights
+
+def _content_rows(img):
+    """
+    标记非纯色的行。聊天背景是纯色，只有这些行才有比较的意义。
+    """
+    flat = img.reshape(img.shape[0], -1)
+    return flat.max(axis=1) != flat.min(axis=1)
+
+def scroll_offset(a, b, content):
+    """
+    根据两帧的行签名，计算新帧相对旧帧向上滚动了多少行。
+    只比较新帧中有内容的行，避免大片空白背景造成误判。
+    返回:
+        偏移量(>0)；没有滚动或对不上时返回None。
+    """
+    import numpy as np
+
+    h = len(b)
+    for s in range(1, h - NEW_MARGIN):
+        overlap = h - s
+        mask = content[:overlap]
+        total = np.count_nonzero(mask)
+        if total and np.count_nonzero((a[s:] == b[:overlap]) & mask) >= MATCH_RATIO * total:
+            return s
+    return None
+
+def new_rows_start(prev, cur):
+    """
+    计算cur中新内容从第几行开始。
+    聊天已满时新消息会把旧内容顶上去，按滚动量取底部；
+    聊天未满时新消息直接画在空白处，取第一处发生变化的行。
+    返回:
+        起始行号；两帧完全相同返回None。
+    """
+    import numpy as np
+
+    if prev is None or prev.shape != cur.shape:
+        return 0
+    a, b = _row_signatures(prev), _row_signatures(cur)
+    changed = np.flatnonzero(a != b)
+    if len(changed) == 0:
+        return None
+    s = scroll_offset(a, b, _content_rows(cur))
+    if s is not None:
+        return len(b) - s
+    return int(changed[0])
+
+# ============ 文本解析 ============
+def _group_boxes(ocr_results):
+    """
+    把EasyOCR的 (bbox, text, conf) 结果按行合并。
+    返回:
+        从上到下的 [(行的纵向位置, 行文本), ...]
+    """
+    boxes = sorted(
+        ((sum(p[1] for p in bbox) / 4, min(p[0] for p in bbox), text) for bbox, text, _ in ocr_results),
+    )
+    lines, current, current_y = [], [], None
+    for y, x, text in boxes:
+        if current and y - current_y > LINE_GAP:
+            lines.append((current_y, " ".join(t for _, t in sorted(current))))
+            current = []
+        if not current:
+            current_y = y
+        current.append((x, text))
+    if current:
+        lines.append((current_y, " ".join(t for _, t in sorted(current))))
+    return lines
+
+def group_lines(ocr_results):
+    """
+    把EasyOCR的 (bbox, text, conf) 结果按行合并，从上到下返回每行文本。
+    """
+    return [text for _, text in _group_boxes(ocr_results)]
+
+def resolve_day(stamp, today: datetime.date) -> str:
+    """
+    把聊天里的时间戳换算成日期（YYYY-MM-DD）。
+    微信只对当天的消息显示 HH:MM，其余显示"昨天"、"星期X"或具体日期。
+    """
+    m = TIME_RE.fullmatch(stamp)
+    year, month, day, relative = m.groups()
+    if month:
+        try:
+            d = datetime.date(int(year) if year else today.year, int(month), int(day))
+        except ValueError:
+            return today.isoformat()  # OCR读错的日期
+        if not year and d > today:
+            d = d.replace(year=today.year - 1)  # 跨年时"12月31日"是去年的
+        return d.isoformat()
+    if relative == "昨天":
+        return (today - datetime.timedelta(days=1)).isoformat()
+    if relative:
+        weekday = WEEKDAYS.index(relative[-1].replace("天", "日"))
+        back = (today.weekday() - weekday) % 7 or 7  # 只显示一周内、今天以前的星期
+        return (today - datetime.timedelta(days=back)).isoformat()
+    return today.isoformat()
+
+def _payment_hash(r):
+    """
+    用收款日期和卡片本身的内容算哈希：金额、付款方、汇总里的笔数和累计金额。
+    汇总的笔数每天从1开始，所以日期必须参与；具体的时分不参与，
+    因为时间戳行常常不在本次截到的区域里，参与了同一条消息会算出不同的哈希。
+    """
+    key = f"{r['day']}|{r['amount']}|{r['payer']}|{r['summary']}"
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+def parse_payments(lines, last=None, today=None, new_from=0):
+    """
+    从按行排列的文本中解析收款记录。
+    卡片标题或"收款金额"行开始一条新记录；"汇总"行、付款方行归入当前记录；
+    时间戳行结束当前记录，并作为后续记录的时间和日期。
+    参数:
+        last: 上一批文本里最后的 (时间戳, 日期)，新区域顶部没有时间戳时沿用
+        today: 截图当天，默认今天；只有 HH:MM 的时间戳按这一天算
+        new_from: 从第几行开始是新内容；起始行在此之前的卡片标记为重读(reread)
+    返回:
+        (记录列表, 最后的 (时间戳, 日期))
+    """
+    today = today or datetime.date.today()
+    paid_at, day = last or (None, None)
+    records, current = [], None
+
+    def start(amount=None):
+        rec = {"amount": amount, "paid_at": paid_at, "day": day or today.isoformat(), "payer": None,
+               "summary": None, "raw": line, "reread": index < new_from}
+        records.append(rec)
+        return rec
+
+    for index, line in enumerate(lines):
+        line = line.strip()
+        if not line:
+            continue
+        if (card := CARD_RE.search(line)):
+            current = start(card.group(1))
+        elif (amount := AMOUNT_RE.search(line)):
+            if current is None or current["amount"] is not None:
+                current = start()  # 卡片标题没截到
+            else:
+                current["raw"] += "\n" + line
+            current["amount"] = amount.group(1)
+        elif current is not None and (summary := SUMMARY_RE.search(line)):
+            current["summary"] = f"{summary.group(1)}|{float(summary.group(2)):.2f}"
+            current["raw"] += "\n" + line
+        elif current is not None and (payer := PAYER_RE.search(line)):
+            current["payer"] = payer.group(1).strip()
+            current["raw"] += "\n" + line
+        elif (stamp := TIME_RE.fullmatch(line)):
+            paid_at = " ".join(stamp.group(0).split())
+            day = resolve_day(paid_at, today)
+            current = None
+        elif current is not None:
+            current["raw"] += "\n" + line
+
+    records = [r for r in records if r["amount"] is not None]
+    for r in records:
+        r["amount"] = f"{float(r['amount']):.2f}"
+        r["hash"] = _payment_hash(r)
+    return records, (paid_at, day)
+
+# ============ 增量提取 ============
+class PaymentExtractor:
+    """
+    保存上一帧聊天区截图，每次只把新增部分交给OCR。
+    """
+
+    def __init__(self, ocr):
+        """
+        参数:
+            ocr: 接收图像、返回EasyOCR格式 [(bbox, text, conf), ...] 的函数
+        """
+        self.ocr = ocr
+        self.prev = None
+        self.last = None
+
+    def new_area(self, img):
+        """
+        返回 (需要OCR的图像区域, 其中与上一帧重叠的行数)；没有新内容返回None。
+        """
+        start = new_rows_start(self.prev, img)
+        self.prev = img
+        if start is None:
+            return None
+        top = max(0, start - NEW_MARGIN)
+        return img[top:], start - top
+
+    def process(self, img):
+        """
+        处理一帧聊天区截图，返回新解析出的收款记录。
+        """
+        found = self.new_area(img)
+        if found is None:
+            return []
+        area, overlap = found
+        boxes = _group_boxes(self.ocr(area))
+        new_from = next((i for i, (y, _) in enumerate(boxes) if y >= overlap), len(boxes))
+        records, self.last = parse_payments([t for _, t in boxes], self.last, new_from=new_from)
+        return records
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+status_client.py
+只读取当前微信状态的轻量客户端，只依赖标准库。
+app.py 和命令行工具用它读状态，不会引入 OCR / 截图相关的重依赖，也不需要图形环境。
+
+用法:
+    python status_client.py [数据库路径]
+
+数据库路径默认是本目录下的 Merged.db，可用环境变量 WECHAT_DB_PATH 覆盖；
+Merged.py 和 app.py 都从这里取路径，保证写者和读者用的是同一个库和同一个快照文件。
+"""
+import os
+import sys
+import time
+import sqlite3
+from pathlib import Path
+
+import statusmap
+
+DB_PATH = Path(os.environ.get("WECHAT_DB_PATH") or Path(__file__).with_name("Merged.db"))
+SNAPSHOT_RETRY = 1.0  # 快照打不开时隔多少秒再试（监控进程可能还没启动）；也是检查快照文件是否被重建的间隔
+
+_readers = {}       # 快照路径 -> StatusMapReader，打开一次后复用
+_open_failed = {}   # 快照路径 -> 上次打开失败的时间
+_checked = {}       # 快照路径 -> 上次确认文件没被替换的时间
+
+# 状态码定义
+wechat_states = {
+    100: {"key": "dialog_selected", "desc": "✅ 微信收款助手对话框已选中"},
+    101: {"key": "dialog_not_selected", "desc": "⚠️ 微信收款助手未选中"},
+    102: {"key": "no_wechat_assistant", "desc": "⚠️ 未检测到微信收款助手"},
+
+    200: {"key": "account_logged_out", "desc": "❌ 当前账号已掉线"},
+    201: {"key": "switching_account", "desc": "🔄 正在切换账号"},
+    202: {"key": "logging_in", "desc": "🔄 正在进入微信"},
+    203: {"key": "mobile_login_required", "desc": "📱 请在手机完成登录"},
+
+    300: {"key": "qrcode_detected", "desc": "🔄 二维码识别成功，等待扫码"},
+
+    900: {"key": "no_window_or_qrcode", "desc": "❗ 未检测到微信窗口或二维码"},
+    901: {"key": "unknown", "desc": "❓ 未知状态"}
+}
+
+def snapshot_path(db_path=DB_PATH) -> Path:
+    """
+    数据库对应的内存映射快照文件：同名，后缀为 .map。
+    """
+    return Path(db_path).with_suffix(".map")
+
+def read_snapshot(db_path=DB_PATH):
+    """
+    从db_path对应的内存映射快照读取当前状态，不经过SQLite。
+    返回:
+        (序号, 状态码, 内容, 时间戳)；快照不存在或暂时读不到时返回None。
+    """
+    path = snapshot_path(db_path)
+    now = time.monotonic()
+    reader = _readers.get(path)
+    if reader is not None and now - _checked[path] >= SNAPSHOT_RETRY:
+        # 快照文件被删掉重建（例如清理后重启监控进程）时，旧映射不会再更新
+        try:
+            replaced = os.stat(path).st_ino != reader.inode
+        except OSError:
+            replaced = True
+        if replaced:
+            _readers.pop(path).close()
+            reader = None
+        else:
+            _checked[path] = now
+    if reader is None:
+        if now - _open_failed.get(path, -SNAPSHOT_RETRY) < SNAPSHOT_RETRY:
+            return None
+        try:
+            reader = _readers[path] = statusmap.StatusMapReader(path)
+        except (OSError, ValueError):
+            _open_failed[path] = now  # 监控进程还没写过快照
+            return None
+        _checked[path] = now
+    return reader.read()
+
+def get_latest_status(db_path=DB_PATH):
+    """
+    读取最新状态。优先读内存映射快照，读不到再查SQLite。
+    返回:
+        (状态码, 内容)；还没有状态数据时返回 (None, None)。
+    """
+    snap = read_snapshot(db_path)
+    if snap is not None:
+        return snap[1], snap[2]
+    conn = sqlite3.connect(db_path)
+    try:
+        row = conn.execute('SELECT code, content FROM status LIMIT 1').fetchone()
+    finally:
+        conn.close()
+    if row:
+        return int(row[0]), row[1]
+    return None, None
+
+def describe(code):
+    """
+    返回状态码对应的 {"key", "desc"}，未知状态码按901处理。
+    """
+    return wechat_states.get(code, wechat_states[901])
+
+if __name__ == '__main__':
+    code, content = get_latest_status(sys.argv[1] if len(sys.argv) > 1 else DB_PATH)
+    if code is None:
+        print("❌ 暂无状态数据")
+        sys.exit(1)
+    print(f"{code} {describe(code)['key']} {describe(code)['desc']}")
+    if content != "None":
+        print(content)
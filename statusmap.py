@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+statusmap.py
+当前状态的内存映射快照。
+Merged.py 每次更新状态后，除了写 SQLite，还把 (状态码, 内容, 时间戳, 序号)
+写进一个固定布局的小文件；app.py 等本机读者直接 mmap 读取，不经过 SQLite 的锁，
+单次读取只需几微秒。SQLite 仍然是持久化的状态记录。
+
+并发控制用 seqlock：只有一个写者（监控进程），写之前把序号加一变成奇数，
+写完再加一变回偶数，并在数据末尾再写一份序号。读者读到奇数序号，
+或读前、读后、末尾三处序号不一致时，说明和写者撞上了，重读即可。
+
+文件布局（小端）:
+    0   4s  魔数 b"WXST"
+    4   I   版本
+    8   Q   序号（奇数表示正在写）
+    16  I   状态码
+    20  d   时间戳
+    28  I   内容长度
+    32  ... 内容（UTF-8）
+    -8  Q   序号副本
+"""
+import os
+import mmap
+import time
+import struct
+
+MAGIC = b"WXST"
+VERSION = 1
+SIZE = 4096
+HEADER = struct.Struct("<4sIQ")
+BODY = struct.Struct("<IdI")
+SEQ = struct.Struct("<Q")
+SEQ_OFF = 8
+BODY_OFF = 16
+CONTENT_OFF = BODY_OFF + BODY.size
+TAIL_OFF = SIZE - SEQ.size
+MAX_CONTENT = TAIL_OFF - CONTENT_OFF
+MAX_RETRIES = 1000
+
+class StatusMapWriter:
+    """
+    状态快照的写者，整个监控进程只应有一个。
+    """
+
+    def __init__(self, path):
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.fstat(fd).st_size != SIZE:
+                os.ftruncate(fd, SIZE)
+            self._map = mmap.mmap(fd, SIZE)
+        finally:
+            os.close(fd)
+        magic, version, seq = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            seq = 0
+            self._map[:] = bytes(SIZE)
+        # 上次在写入途中退出时序号是奇数，补成偶数后接着用
+        self.seq = seq + (seq & 1)
+        HEADER.pack_into(self._map, 0, MAGIC, VERSION, self.seq)
+
+    def publish(self, code, content: str, ts: float = None):
+        """
+        写入一份新快照，返回它的序号。内容超长时按UTF-8字符边界截断。
+        """
+        data = content.encode("utf-8")
+        if len(data) > MAX_CONTENT:
+            data = data[:MAX_CONTENT].decode("utf-8", "ignore").encode("utf-8")
+        m = self._map
+        SEQ.pack_into(m, SEQ_OFF, self.seq + 1)  # 奇数：写入中
+        BODY.pack_into(m, BODY_OFF, int(code), time.time() if ts is None else ts, len(data))
+        m[CONTENT_OFF:CONTENT_OFF + len(data)] = data
+        self.seq += 2
+        SEQ.pack_into(m, TAIL_OFF, self.seq)
+        SEQ.pack_into(m, SEQ_OFF, self.seq)
+        return self.seq
+
+    def close(self):
+        self._map.close()
+
+class StatusMapReader:
+    """
+    状态快照的读者，不加锁，可以有任意多个。
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.inode = os.fstat(f.fileno()).st_ino  # 文件被删掉重建后映射的还是旧文件，靠它发现
+            self._map = mmap.mmap(f.fileno(), SIZE, access=mmap.ACCESS_READ)
+        if HEADER.unpack_from(self._map, 0)[:2] != (MAGIC, VERSION):
+            self._map.close()
+            raise ValueError(f"不是状态快照文件: {path}")
+
+    def read(self):
+        """
+        读取一份完整的快照。
+        返回:
+            (序号, 状态码, 内容, 时间戳)；还没写过快照，或一直与写者冲突时返回None。
+        """
+        m = self._map
+        for attempt in range(MAX_RETRIES):
+            if attempt:
+                time.sleep(0)  # 和写者撞上了，让出CPU等它写完
+            seq = SEQ.unpack_from(m, SEQ_OFF)[0]
+            if seq & 1:
+                continue
+            code, ts, length = BODY.unpack_from(m, BODY_OFF)
+            data = m[CONTENT_OFF:CONTENT_OFF + min(length, MAX_CONTENT)]
+            if SEQ.unpack_from(m, TAIL_OFF)[0] != seq or SEQ.unpack_from(m, SEQ_OFF)[0] != seq:
+                continue
+            if seq == 0:
+                return None
+            return seq, code, data.decode("utf-8"), ts
+        return None
+
+    def close(self):
+        self._map.close()
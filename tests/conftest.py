@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# 仓库是平铺的脚本，没有打包，测试直接从根目录导入模块
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
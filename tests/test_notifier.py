@@ -0,0 +1,217 @@
+import json
+import time
+import sqlite3
+import threading
+from http.server import HTTPServer, BaseHTTPRequestHandler
+
+import pytest
+
+import notifier
+
+
+class StubServer:
+    """
+    本地 Webhook 桩：按 responses 顺序返回状态码（用完后一律 200），
+    记录每个请求的事件列表和客户端连接。
+    """
+
+    def __init__(self, responses=()):
+        self.responses = list(responses)
+        self.requests = []
+        self.events = []
+        self.clients = set()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # 支持长连接
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                stub.clients.add(self.client_address)
+                stub.requests.append([e["code"] for e in body["events"]])
+                stub.events.extend(body["events"])
+                status = stub.responses.pop(0) if stub.responses else 200
+                self.send_response(status)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = HTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/hook"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub():
+    servers = []
+
+    def make(responses=()):
+        servers.append(StubServer(responses))
+        return servers[-1]
+
+    yield make
+    for s in servers:
+        s.close()
+
+
+@pytest.fixture
+def db(tmp_path):
+    path = tmp_path / "status.db"
+    with sqlite3.connect(path) as conn:
+        notifier.init_outbox(conn)
+    return path
+
+
+def enqueue(db, target, codes):
+    with sqlite3.connect(db) as conn:
+        for code in codes:
+            notifier.enqueue(conn, None, code, "None", [target])
+
+
+def outbox(db):
+    conn = sqlite3.connect(db)
+    try:
+        return conn.execute("SELECT attempts, dead, last_error FROM outbox ORDER BY id").fetchall()
+    finally:
+        conn.close()
+
+
+def test_batches_over_one_keepalive_connection(stub, db):
+    server = stub()
+    enqueue(db, server.url, ["100", "101", "102", "200", "300"])
+    d = notifier.Dispatcher(db, targets=[server.url], batch_size=2)
+    try:
+        assert d.flush() == 5
+    finally:
+        d.pool.close()
+    assert server.requests == [["100", "101"], ["102", "200"], ["300"]]
+    assert len(server.clients) == 1
+    assert outbox(db) == []
+
+
+def test_500_backs_off_then_delivers(stub, db, monkeypatch):
+    monkeypatch.setattr(notifier, "RETRY_BASE", 0.2)
+    server = stub([500])
+    enqueue(db, server.url, ["100", "200"])
+    d = notifier.Dispatcher(db, targets=[server.url])
+    try:
+        assert d.flush() == 0
+        assert outbox(db) == [(1, 0, "HTTP 500"), (1, 0, "HTTP 500")]
+        assert d.flush() == 0  # 仍在退避期，不应发请求
+        assert len(server.requests) == 1
+        time.sleep(0.25)
+        assert d.flush() == 2
+    finally:
+        d.pool.close()
+    assert server.requests == [["100", "200"], ["100", "200"]]
+    assert outbox(db) == []
+
+
+def test_permanent_4xx_is_dead_lettered_without_blocking(stub, db):
+    server = stub([400])
+    enqueue(db, server.url, ["100"])
+    d = notifier.Dispatcher(db, targets=[server.url], batch_size=1)
+    try:
+        assert d.flush() == 0
+        assert outbox(db) == [(1, 1, "HTTP 400")]
+        enqueue(db, server.url, ["200"])
+        assert d.flush() == 1
+    finally:
+        d.pool.close()
+    assert server.requests == [["100"], ["200"]]
+    assert outbox(db) == [(1, 1, "HTTP 400")]
+
+
+def test_permanent_failure_dead_letters_only_one_batch_per_flush(stub, db):
+    server = stub([400])
+    enqueue(db, server.url, ["100", "101", "102"])
+    d = notifier.Dispatcher(db, targets=[server.url], batch_size=1)
+    try:
+        assert d.flush() == 0
+    finally:
+        d.pool.close()
+    assert server.requests == [["100"]]
+    assert outbox(db) == [(1, 1, "HTTP 400"), (0, 0, None), (0, 0, None)]
+
+
+def test_transient_4xx_is_retried_not_dead_lettered(stub, db, monkeypatch):
+    monkeypatch.setattr(notifier, "RETRY_BASE", 0)
+    server = stub([404, 401])
+    enqueue(db, server.url, ["100", "101"])
+    d = notifier.Dispatcher(db, targets=[server.url], batch_size=1)
+    try:
+        assert d.flush() == 0
+        assert outbox(db) == [(1, 0, "HTTP 404"), (0, 0, None)]
+        assert d.flush() == 0
+        assert d.flush() == 2
+    finally:
+        d.pool.close()
+    assert server.requests == [["100"], ["100"], ["100"], ["101"]]
+    assert outbox(db) == []
+
+
+def test_events_carry_stable_ids_across_resends(stub, db, monkeypatch):
+    monkeypatch.setattr(notifier, "RETRY_BASE", 0)
+    server = stub([500])
+    enqueue(db, server.url, ["100", "200"])
+    d = notifier.Dispatcher(db, targets=[server.url])
+    try:
+        d.flush()
+        d.flush()
+    finally:
+        d.pool.close()
+    first, second = server.events[:2], server.events[2:]
+    assert [e["id"] for e in first] == [e["id"] for e in second]
+    assert len({e["id"] for e in first}) == 2
+
+
+def test_gives_up_after_max_attempts(stub, db, monkeypatch):
+    monkeypatch.setattr(notifier, "RETRY_BASE", 0)
+    monkeypatch.setattr(notifier, "MAX_ATTEMPTS", 2)
+    server = stub([503, 503])
+    enqueue(db, server.url, ["100"])
+    d = notifier.Dispatcher(db, targets=[server.url])
+    try:
+        assert d.flush() == 0
+        assert d.flush() == 0
+        assert d.flush() == 0
+    finally:
+        d.pool.close()
+    assert len(server.requests) == 2
+    assert outbox(db) == [(2, 1, "HTTP 503")]
+
+
+def test_removed_target_is_not_retried(stub, db):
+    server = stub()
+    enqueue(db, "http://127.0.0.1:9/gone", ["100"])
+    enqueue(db, server.url, ["200"])
+    d = notifier.Dispatcher(db, targets=[server.url])
+    try:
+        assert d.flush() == 1
+    finally:
+        d.pool.close()
+    assert outbox(db) == [(0, 1, "target removed from config")]
+
+
+def test_dispatcher_thread_delivers_after_wake(stub, db):
+    server = stub()
+    d = notifier.Dispatcher(db, targets=[server.url], batch_wait=0.05, poll_interval=30)
+    d.start()
+    try:
+        enqueue(db, server.url, ["300"])
+        notifier.wake()
+        deadline = time.time() + 5
+        while not server.requests and time.time() < deadline:
+            time.sleep(0.01)
+    finally:
+        d.stop()
+        d.join(5)
+    assert server.requests == [["300"]]
+    assert outbox(db) == []
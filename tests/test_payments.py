@@ -0,0 +1,155 @@
+import sqlite3
+import datetime
+
+import pytest
+
+import payments
+
+CARD_1 = ["10:05", "收款到账通知", "收款金额 ￥10.00", "汇总 今日第1笔收款，共计￥10.00", "付款方备注 无"]
+CARD_2 = ["收款到账通知", "收款金额 ￥10.00", "汇总 今日第2笔收款，共计￥20.00", "付款方备注 无"]
+TODAY = datetime.date(2026, 10, 19)
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:")
+    payments.init_payments(conn)
+    yield conn
+    conn.close()
+
+
+def parse(lines, last=None, **kwargs):
+    return payments.parse_payments(lines, last, today=TODAY, **kwargs)[0]
+
+
+def collisions(conn):
+    return conn.execute("SELECT COUNT(*) FROM payment_collisions").fetchone()[0]
+
+
+def test_parses_card_fields():
+    (rec,) = parse(CARD_1)
+    assert rec["amount"] == "10.00"
+    assert rec["paid_at"] == "10:05"
+    assert rec["summary"] == "1|10.00"
+    assert rec["payer"] is None  # 付款方备注不是付款方
+
+
+def test_summary_line_is_not_a_payment():
+    records = parse(CARD_2)
+    assert [r["amount"] for r in records] == ["10.00"]
+
+
+def test_payer_line():
+    (rec,) = parse(["收款到账通知", "收款金额 ￥8.50", "付款方 张三", "付款方备注 午饭"])
+    assert rec["payer"] == "张三"
+
+
+def test_legacy_header_with_amount():
+    records = parse(["14:32", "微信支付收款3.00元", "微信支付收款12.5元"])
+    assert [r["amount"] for r in records] == ["3.00", "12.50"]
+
+
+def test_same_amount_in_later_tick_is_a_new_payment(conn):
+    assert payments.save_payments(conn, parse(CARD_1)) == 1
+    assert payments.save_payments(conn, parse(CARD_2, ("10:05", "2026-10-19"))) == 1
+    assert collisions(conn) == 0
+
+
+def test_reread_with_different_context_is_idempotent(conn):
+    first = parse(CARD_1 + CARD_2)
+    assert payments.save_payments(conn, first) == 2
+    # 整屏重读：时间戳不同、卡片标题被截掉，都不应重复入库
+    again = parse(CARD_1[2:] + CARD_2, ("09:00", "2026-10-19"))
+    assert payments.save_payments(conn, again) == 0
+    assert collisions(conn) == 0
+    assert conn.execute("SELECT COUNT(*) FROM payments").fetchone()[0] == 2
+
+
+def test_same_summary_on_different_days_are_different_payments(conn):
+    day1 = ["10月18日 10:05"] + CARD_1[1:]
+    day2 = CARD_1
+    assert payments.save_payments(conn, parse(day1)) == 1
+    assert payments.save_payments(conn, parse(day2)) == 1
+    assert collisions(conn) == 0
+    days = [r[0] for r in conn.execute("SELECT day FROM payments ORDER BY day")]
+    assert days == ["2026-10-18", "2026-10-19"]
+
+
+def test_resolve_day():
+    monday = datetime.date(2026, 10, 19)
+    assert monday.weekday() == 0
+    assert payments.resolve_day("10:05", monday) == "2026-10-19"
+    assert payments.resolve_day("昨天 23:50", monday) == "2026-10-18"
+    assert payments.resolve_day("星期五 08:00", monday) == "2026-10-16"
+    assert payments.resolve_day("星期一 08:00", monday) == "2026-10-12"
+    assert payments.resolve_day("星期天 08:00", monday) == "2026-10-18"
+    assert payments.resolve_day("12月31日 下午 3:00", datetime.date(2027, 1, 2)) == "2026-12-31"
+    assert payments.resolve_day("2025年3月1日 09:00", monday) == "2025-03-01"
+
+
+def test_indistinguishable_payments_are_recorded_as_collisions(conn):
+    assert payments.save_payments(conn, parse(["收款到账通知", "收款金额 ￥10.00", "付款方备注 午饭"])) == 1
+    assert payments.save_payments(conn, parse(["收款到账通知", "收款金额 ￥10.00", "付款方备注 晚饭"])) == 0
+    assert collisions(conn) == 1
+
+
+def test_rereading_an_identical_card_is_not_a_collision(conn):
+    card = ["微信支付收款10.00元"]
+    assert payments.save_payments(conn, parse(card)) == 1
+    for _ in range(3):  # 例如重启后整屏重读
+        assert payments.save_payments(conn, parse(card)) == 0
+    assert collisions(conn) == 0
+
+
+def test_cards_in_overlap_margin_are_rereads(conn):
+    lines = ["收款到账通知", "收款金额 ￥10.00", "10:06", "微信支付收款5.00元"]
+    old, new = parse(lines, new_from=2)
+    assert (old["reread"], new["reread"]) == (True, False)
+    payments.save_payments(conn, parse(["收款到账通知", "收款金额 ￥10.00 午饭"]))
+    assert payments.save_payments(conn, [old, new]) == 1
+    assert collisions(conn) == 0
+
+
+def test_new_rows_start_after_scroll():
+    np = pytest.importorskip("numpy")
+    rng = np.random.default_rng(0)
+    history = rng.integers(0, 255, (1000, 50, 3), dtype=np.uint8)
+    history[::7] = 240  # 夹杂纯色行
+    assert payments.new_rows_start(history[0:400], history[120:520]) == 280
+
+
+def test_new_rows_start_unchanged_and_resized():
+    np = pytest.importorskip("numpy")
+    frame = np.zeros((100, 20, 3), dtype=np.uint8)
+    assert payments.new_rows_start(frame, frame.copy()) is None
+    assert payments.new_rows_start(None, frame) == 0
+    assert payments.new_rows_start(np.zeros((80, 20, 3), dtype=np.uint8), frame) == 0
+
+
+def test_new_rows_start_append_into_blank_area():
+    np = pytest.importorskip("numpy")
+    rng = np.random.default_rng(1)
+    blank = np.full((400, 50, 3), 255, dtype=np.uint8)
+    cur = blank.copy()
+    cur[200:260] = rng.integers(0, 255, (60, 50, 3), dtype=np.uint8)
+    assert payments.new_rows_start(blank, cur) == 200
+
+
+def test_extractor_flags_lines_from_overlap_margin():
+    np = pytest.importorskip("numpy")
+    rng = np.random.default_rng(2)
+    prev = np.full((400, 50, 3), 255, dtype=np.uint8)
+    cur = prev.copy()
+    cur[200:260] = rng.integers(0, 255, (60, 50, 3), dtype=np.uint8)
+    seen = []
+
+    def fake_ocr(area):
+        seen.append(area.shape[0])
+        box = lambda y: [[0, y], [10, y], [10, y + 10], [0, y + 10]]  # noqa: E731
+        return [(box(5), "微信支付收款10.00元", 0.9), (box(55), "微信支付收款5.00元", 0.9)]
+
+    extractor = payments.PaymentExtractor(fake_ocr)
+    extractor.prev = prev
+    records = extractor.process(cur)
+    assert seen == [400 - 200 + payments.NEW_MARGIN]
+    assert [(r["amount"], r["reread"]) for r in records] == [("10.00", True), ("5.00", False)]
@@ -0,0 +1,61 @@
+import sqlite3
+
+import status_client
+import statusmap
+
+
+def write_sqlite(db, code, content):
+    with sqlite3.connect(db) as conn:
+        conn.execute("CREATE TABLE IF NOT EXISTS status (code TEXT PRIMARY KEY, content TEXT)")
+        conn.execute("DELETE FROM status")
+        conn.execute("INSERT INTO status (code, content) VALUES (?, ?)", (code, content))
+
+
+def test_prefers_snapshot_over_sqlite(tmp_path):
+    db = tmp_path / "status.db"
+    write_sqlite(db, "200", "None")
+    writer = statusmap.StatusMapWriter(status_client.snapshot_path(db))
+    try:
+        writer.publish("300", "https://login.weixin.qq.com/l/abc")
+        assert status_client.get_latest_status(db) == (300, "https://login.weixin.qq.com/l/abc")
+    finally:
+        writer.close()
+
+
+def test_missing_snapshot_falls_back_and_is_not_reopened_every_call(tmp_path, monkeypatch):
+    db = tmp_path / "status.db"
+    write_sqlite(db, "200", "None")
+    opened = []
+    real_reader = statusmap.StatusMapReader
+
+    def counting_reader(path):
+        opened.append(path)
+        return real_reader(path)
+
+    monkeypatch.setattr(statusmap, "StatusMapReader", counting_reader)
+    for _ in range(5):
+        assert status_client.get_latest_status(db) == (200, "None")
+    assert len(opened) == 1
+
+    # 监控进程启动后，过了重试间隔就能读到快照
+    statusmap.StatusMapWriter(status_client.snapshot_path(db)).publish("100", "None")
+    monkeypatch.setattr(status_client, "SNAPSHOT_RETRY", 0)
+    assert status_client.get_latest_status(db) == (100, "None")
+
+
+def test_recreated_snapshot_is_reopened(tmp_path, monkeypatch):
+    db = tmp_path / "status.db"
+    path = status_client.snapshot_path(db)
+    writer = statusmap.StatusMapWriter(path)
+    writer.publish("100", "None")
+    writer.close()
+    assert status_client.get_latest_status(db) == (100, "None")
+
+    # 删掉快照文件后重启监控进程：旧映射停在100，新文件里已是200
+    path.unlink()
+    writer = statusmap.StatusMapWriter(path)
+    writer.publish("200", "None")
+    writer.close()
+    assert status_client.get_latest_status(db) == (100, "None")  # 还没到检查间隔
+    monkeypatch.setattr(status_client, "SNAPSHOT_RETRY", 0)
+    assert status_client.get_latest_status(db) == (200, "None")
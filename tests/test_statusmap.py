@@ -0,0 +1,21 @@
+import bench_statusmap
+import statusmap
+
+
+def test_publish_then_read(tmp_path):
+    path = tmp_path / "status.map"
+    writer = statusmap.StatusMapWriter(path)
+    reader = statusmap.StatusMapReader(path)
+    try:
+        assert reader.read() is None
+        seq = writer.publish("300", "https://login.weixin.qq.com/l/abc", 1.5)
+        assert reader.read() == (seq, 300, "https://login.weixin.qq.com/l/abc", 1.5)
+    finally:
+        reader.close()
+        writer.close()
+
+
+def test_concurrent_readers_never_see_torn_snapshots():
+    published, reads, torn, _, _ = bench_statusmap.run(readers=3, duration=1.5)
+    assert published > 0 and reads > 0
+    assert torn == 0